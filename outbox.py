@@ -0,0 +1,109 @@
+import discord
+import asyncio
+import functools
+import itertools
+import time
+
+# queue priorities, lower goes first
+SEND, DELETE, EDIT = 0, 1, 2
+
+
+class DiscordOutbox:
+    """Per-channel queue for Discord API calls that coalesces edits"""
+
+    def __init__(self, rate=1.0, burst=5):
+        self.rate = rate  # seconds per call once the burst is used up
+        self.burst = burst
+        self.queues = {}
+        self.workers = {}
+        self.pending_edits = {}  # message id -> (latest content, on_gone)
+        self.shown = {}  # message id -> content Discord currently shows
+        self._seq = itertools.count()
+
+    def _put(self, channel_id, priority, op, *args, fut=None):
+        queue = self.queues.get(channel_id)
+        if queue is None:
+            queue = self.queues[channel_id] = asyncio.PriorityQueue()
+            self.workers[channel_id] = asyncio.get_running_loop().create_task(
+                self._worker(queue))
+        queue.put_nowait((priority, next(self._seq), op, args, fut))
+        return fut
+
+    def send(self, channel, content):
+        """Queue a new message, await the result to get the Message"""
+        fut = asyncio.get_running_loop().create_future()
+        return self._put(channel.id, SEND, self._send, channel, content, fut=fut)
+
+    def delete(self, message):
+        """Queue a delete, dropping any edit still waiting for this message"""
+        self.pending_edits.pop(message.id, None)
+        self.shown.pop(message.id, None)
+        fut = asyncio.get_running_loop().create_future()
+        return self._put(message.channel.id, DELETE, message.delete, fut=fut)
+
+    def edit(self, message, content, on_gone=None):
+        """Queue an edit without waiting, a newer edit replaces a queued one
+
+        content may be a callable, it is only called right before the request
+        so edits that get coalesced away are never rendered. Nobody awaits the
+        edit, so if the message was deleted meanwhile on_gone(message) is
+        called instead of raising.
+        """
+        queued = message.id in self.pending_edits
+        self.pending_edits[message.id] = (content, on_gone)
+        if not queued:
+            self._put(message.channel.id, EDIT, self._flush_edit, message)
+
+    async def _send(self, channel, content):
+        message = await channel.send(content)
+        self.shown[message.id] = content
+        return message
+
+    async def _flush_edit(self, message):
+        content, on_gone = self.pending_edits.pop(message.id, (None, None))
+        if callable(content):
+            content = content()
+        # skip the request when the message already shows this content
+        if content is not None and content != self.shown.get(message.id):
+            try:
+                # retry just the request, the pending entry is already consumed
+                await self._call(functools.partial(message.edit, content=content), ())
+            except discord.NotFound:
+                self.shown.pop(message.id, None)
+                if on_gone:
+                    on_gone(message)
+                return
+            self.shown[message.id] = content
+
+    async def _call(self, op, args):
+        while True:
+            try:
+                return await op(*args)
+            except discord.HTTPException as e:
+                if e.status != 429:
+                    raise
+                # rate limited anyway, wait it out and retry
+                await asyncio.sleep(getattr(e, "retry_after", None) or self.rate)
+
+    async def _worker(self, queue):
+        tokens, last = self.burst, time.monotonic()
+        while True:
+            _, _, op, args, fut = await queue.get()
+
+            # token bucket, refills one call every `rate` seconds
+            now = time.monotonic()
+            tokens = min(self.burst, tokens + (now - last) / self.rate)
+            last = now
+            if tokens < 1:
+                await asyncio.sleep((1 - tokens) * self.rate)
+                tokens, last = 1, time.monotonic()
+            tokens -= 1
+
+            try:
+                result = await self._call(op, args)
+            except Exception as e:
+                if fut and not fut.done():
+                    fut.set_exception(e)
+            else:
+                if fut and not fut.done():
+                    fut.set_result(result)
@@ -2,10 +2,19 @@ import discord
 from discord.ext import commands
 import random
 import asyncio
+import atexit
+import bisect
 import json
 import os
+import re
+from dataclasses import dataclass
 from datetime import datetime
 import time
+from outbox import DiscordOutbox
+try:
+    import orjson  # optional, faster drop-in for the tris.log records
+except ImportError:
+    orjson = None
 
 # define pieces
 WIDTH, HEIGHT = 7, 12
@@ -30,150 +39,395 @@ def rotate_i_piece_center(piece):
         return piece  # fallback
 
 
+# board rows and piece rows are bitmasks, bit x is column x
+ROW_MASK = (1 << WIDTH) - 1
+
+
+def piece_to_rows(piece):
+    """Pack a piece grid into a tuple of left-aligned row bitmasks"""
+    return tuple(sum(cell << x for x, cell in enumerate(row)) for row in piece)
+
+
+def piece_width(piece):
+    return max(row.bit_length() for row in piece)
+
+
+def shift_row(row, px):
+    """Move a left-aligned piece row to column px"""
+    return row << px if px >= 0 else row >> -px
+
+
+def _rotation_cycle(piece_type):
+    rotate = rotate_i_piece_center if piece_type == 'I' else rotate_piece
+    piece, cycle = PIECES[piece_type], []
+    while True:
+        rows = piece_to_rows(piece)
+        if rows in cycle:  # back to a known state, symmetric shapes stop early
+            return tuple(cycle)
+        cycle.append(rows)
+        piece = rotate(piece)
+
+
+def bottom_profile(piece):
+    """Lowest filled row of the piece for each column it occupies"""
+    return tuple((x, max(y for y, row in enumerate(piece) if (row >> x) & 1))
+                 for x in range(piece_width(piece)))
+
+
+# distinct rotation states packed once at import, rotating is a table lookup
+ROTATIONS = {k: _rotation_cycle(k) for k in PIECES}
+BOTTOM_PROFILES = {rows: bottom_profile(rows)
+                   for cycle in ROTATIONS.values() for rows in cycle}
+PIECE_EXTENTS = {rows: (piece_width(rows), max(y + 1 for y, row in enumerate(rows) if row))
+                 for cycle in ROTATIONS.values() for rows in cycle}
+PIECE_IDS = tuple(PIECES)
+
+
 def empty_board():
-    return [[0] * WIDTH for _ in range(HEIGHT)]
+    return [0] * HEIGHT
 
 
-def load_scores():
-    """Load scores from tris.log file"""
-    if os.path.exists("tris.log"):
-        try:
-            with open("tris.log", "r") as f:
-                return [json.loads(line) for line in f if line.strip()]
-        except:
-            return []
-    return []
+def drop_distance(columns, profile, px, py):
+    """How many rows the piece can fall before it lands"""
+    dists = []
+    for x, bottom in profile:
+        y = py + bottom + 1  # first row under the piece in this column
+        below = columns[px + x] >> y << y if y > 0 else columns[px + x]
+        top = (below & -below).bit_length() - 1 if below else HEIGHT  # lowest set bit
+        dists.append(top - y)
+    return min(dists)
+
+
+def dump_record(entry):
+    # keys starting with _ are derived at load time and never written
+    entry = {k: v for k, v in entry.items() if not k.startswith("_")}
+    return (orjson.dumps(entry) if orjson else json.dumps(entry).encode()) + b"\n"
+
+
+def load_record(line):
+    entry = orjson.loads(line) if orjson else json.loads(line)
+    # _score_key sorts on these, a record without them is treated as damaged
+    if (not isinstance(entry, dict) or not isinstance(entry.get("score"), (int, float))
+            or not isinstance(entry.get("timestamp"), str)):
+        raise ValueError("record without a score or timestamp")
+    entry["_ts"] = datetime.fromisoformat(entry["timestamp"]).timestamp()  # parsed once
+    return entry
+
+
+# in-memory copy of tris.log keyed by user_id, the file is append-only
+_scores_cache = None
+_log_lines = 0
+_leaderboard = []  # cached entries kept sorted by _score_key
+_log_fp = None  # append handle, kept open between saves
+_log_damaged = False  # tris.log could not be read fully, never rewrite it this run
+
+
+def _score_key(entry):
+    # sort looking at score, and timestamp if tie
+    return (-entry["score"], entry["_ts"])
+
+
+def _load_cache():
+    """Read tris.log once, the last record for each user wins"""
+    global _scores_cache, _log_lines, _log_damaged
+    if _scores_cache is None:
+        _scores_cache = {}
+        bad_lines = []
+        if os.path.exists("tris.log"):
+            try:
+                with open("tris.log", "rb") as f:  # records are written as UTF-8 bytes
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        try:
+                            entry = load_record(line)
+                        except (ValueError, KeyError, TypeError):
+                            bad_lines.append(line)  # e.g. a torn last write, skip just this line
+                            continue
+                        _scores_cache[entry.get("user_id")] = entry
+                        _log_lines += 1
+            except OSError as e:
+                _log_damaged = True
+                print(f"tris.log could not be read ({e}), not compacting it this run")
+        if bad_lines and not _log_damaged:
+            # keep unreadable lines next to the log so compaction can drop them safely
+            try:
+                with open("tris.log.bad", "ab") as f:
+                    f.writelines(line if line.endswith(b"\n") else line + b"\n" for line in bad_lines)
+                print(f"moved {len(bad_lines)} unreadable tris.log lines to tris.log.bad")
+            except OSError as e:
+                _log_damaged = True
+                print(f"could not save unreadable tris.log lines ({e}), not compacting it this run")
+        _leaderboard[:] = sorted(_scores_cache.values(), key=_score_key)
+        if (_log_lines > len(_scores_cache) or bad_lines) and not _log_damaged:
+            compact_scores()  # drop superseded records left by the last run
+    return _scores_cache
+
+
+def _append_record(entry):
+    global _log_fp
+    if _log_fp is None:
+        _log_fp = open("tris.log", "ab", buffering=64 * 1024)
+        if _log_fp.tell() and not _ends_with_newline("tris.log"):
+            _log_fp.write(b"\n")  # finish a torn last line instead of appending to it
+    _log_fp.write(dump_record(entry))
+    _log_fp.flush()  # one write per record, no fsync needed for a game log
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _close_log():
+    global _log_fp
+    if _log_fp is not None:
+        _log_fp.close()
+        _log_fp = None
+
+
+atexit.register(_close_log)
+
+
+def compact_scores():
+    """Rewrite tris.log with a single record per user"""
+    global _log_lines
+    scores = _load_cache()
+    _close_log()
+    # write a fresh copy and swap it in, a crash mid-write keeps the old log
+    with open("tris.log.tmp", "wb") as f:
+        f.write(b"".join(dump_record(entry) for entry in scores.values()))
+    os.replace("tris.log.tmp", "tris.log")
+    _log_lines = len(scores)
 
 
 def save_score(username, score, avatar_url, user_id, lines_cleared=0, game_time=0):
     """Save a score to tris.log file, updating individual bests independently"""
-    scores = load_scores()
-    for entry in scores:
-        if entry.get("user_id") == user_id:
-            entry.update({
-                "games_played": entry.get("games_played", 0) + 1,
-                "total_lines": entry.get("total_lines", 0) + lines_cleared,
-                "total_time": entry.get("total_time", 0) + game_time,
-                "username": username,
-                "avatar_url": avatar_url
-            })
-
-            # Update bests independently
-            if score > entry.get("score", 0):
-                entry.update(
-                    {"score": score, "timestamp": datetime.now().isoformat()})
-            if lines_cleared > entry.get("best_lines", 0):
-                entry.update({"best_lines": lines_cleared,
-                             "best_lines_timestamp": datetime.now().isoformat()})
-            if game_time > entry.get("best_time", 0):
-                entry.update(
-                    {"best_time": game_time, "best_time_timestamp": datetime.now().isoformat()})
-            break
+    global _log_lines
+    now = datetime.now()
+    now_iso = now.isoformat()
+    scores = _load_cache()
+    entry = scores.get(user_id)
+    if entry:
+        # assign in place, no temporary dict per save
+        entry["games_played"] = entry.get("games_played", 0) + 1
+        entry["total_lines"] = entry.get("total_lines", 0) + lines_cleared
+        entry["total_time"] = entry.get("total_time", 0) + game_time
+        entry["username"] = username
+        entry["avatar_url"] = avatar_url
+
+        # Update bests independently
+        if score > entry.get("score", 0):
+            # pull the entry out of the leaderboard before its key changes
+            i = bisect.bisect_left(_leaderboard, _score_key(entry), key=_score_key)
+            while _leaderboard[i] is not entry:  # step over ties
+                i += 1
+            del _leaderboard[i]
+            entry["score"] = score
+            entry["timestamp"] = now_iso
+            entry["_ts"] = now.timestamp()
+            entry["date_mmdd"] = now.strftime("%m/%d")
+            bisect.insort(_leaderboard, entry, key=_score_key)
+        if lines_cleared > entry.get("best_lines", 0):
+            entry["best_lines"] = lines_cleared
+            entry["best_lines_timestamp"] = now_iso
+            entry["best_lines_mmdd"] = now.strftime("%m/%d")
+        if game_time > entry.get("best_time", 0):
+            entry["best_time"] = game_time
+            entry["best_time_timestamp"] = now_iso
+            entry["best_time_mmdd"] = now.strftime("%m/%d")
     else:
-        scores.append({
+        entry = scores[user_id] = {
             "username": username, "score": score, "avatar_url": avatar_url, "user_id": user_id,
-            "timestamp": datetime.now().isoformat(), "games_played": 1, "total_lines": lines_cleared,
+            "timestamp": now_iso, "date_mmdd": now.strftime("%m/%d"),
+            "games_played": 1, "total_lines": lines_cleared,
             "total_time": game_time, "best_lines": lines_cleared, "best_time": game_time,
-            "best_lines_timestamp": datetime.now().isoformat(), "best_time_timestamp": datetime.now().isoformat()
-        })
-
-    with open("tris.log", "w") as f:
-        for entry in scores:
-            f.write(json.dumps(entry) + "\n")
+            "best_lines_timestamp": now_iso, "best_time_timestamp": now_iso,
+            "best_lines_mmdd": now.strftime("%m/%d"), "best_time_mmdd": now.strftime("%m/%d"),
+            "_ts": now.timestamp()
+        }
+        bisect.insort(_leaderboard, entry, key=_score_key)
+
+    entry.pop("_display", None)  # stats changed, rebuild the !score text
+
+    # append the updated record, compact once stale records pile up
+    _append_record(entry)
+    _log_lines += 1
+    if _log_lines > 2 * len(scores) and not _log_damaged:
+        compact_scores()
+
+
+def score_date(entry, key="date_mmdd", timestamp="timestamp"):
+    """MM/DD of a stored timestamp, older records get it cached on first use"""
+    date = entry.get(key)
+    if date is None and timestamp in entry:
+        date = entry[key] = datetime.fromisoformat(
+            entry[timestamp]).strftime("%m/%d")
+    return date
+
+
+def score_stats_text(entry):
+    """Statistics block shown by !score, cached until the entry changes"""
+    stats_text = entry.get("_display")
+    if stats_text is not None:
+        return stats_text
+    date = score_date(entry)
+    games_played = entry.get("games_played", 1)
+    total_lines = entry.get("total_lines", 0)
+    total_time = entry.get("total_time", 0)
+    best_lines = entry.get("best_lines", 0)
+    best_time = entry.get("best_time", 0)
+    best_lines_date = score_date(entry, "best_lines_mmdd", "best_lines_timestamp")
+    best_lines_date = f" ({best_lines_date})" if best_lines_date else ""
+    best_time_date = score_date(entry, "best_time_mmdd", "best_time_timestamp")
+    best_time_date = f" ({best_time_date})" if best_time_date else ""
+    avg_score = entry["score"] / games_played if games_played > 0 else 0
+    avg_lines = total_lines / games_played if games_played > 0 else 0
+    avg_time = total_time / games_played if games_played > 0 else 0
+    stats_text = entry["_display"] = (
+        f"**Best Score:** {entry['score']:,} pts ({date})\n"
+        f"**Games:** {games_played} | **Avg Score:** {avg_score:,.0f}\n"
+        f"**Best Lines:** {best_lines}{best_lines_date} | **Total:** {total_lines:,} | **Avg:** {avg_lines:.1f}\n"
+        f"**Longest game:** {best_time:.1f}s{best_time_date} | **Avg Time:** {avg_time:.1f}s\n"
+        f"**Total Time:** {total_time:.1f}s"
+    )
+    return stats_text
 
 
 def get_highscores(limit=10):
-    """Get top scores from log file"""
-    scores = load_scores()
-    # sort looking at score, and timestamp if tie
-    scores.sort(key=lambda x: (-x["score"], x["timestamp"]))
-    return scores[:limit]
-
-
-def render_board(board, piece=None, px=0, py=0):
-    lines = []
-    for y in range(HEIGHT):
-        line = []
-        for x in range(WIDTH):
-            cell = board[y][x]
-            # check piece overlap
-            if (piece and py <= y < py + len(piece) and
-                px <= x < px + len(piece[0]) and
-                    piece[y - py][x - px]):
-                cell = 2
-            line.append(EMOJI_MAP[cell])  # change to emojis
-        lines.append(''.join(line))
-    return '\n'.join(lines)
+    """Get top scores from the in-memory leaderboard"""
+    _load_cache()
+    return _leaderboard[:limit]
 
 
-def check_collision(board, piece, px, py):
-    for y, row in enumerate(piece):
-        for x, cell in enumerate(row):
-            if cell:    # only check parts of the piece
-                bx, by = px + x, py + y  # to board coords
-                if bx < 0 or bx >= WIDTH or by >= HEIGHT:  # out of bounds
-                    return True
-                # Only check board collision if piece is within visible area
-                if by >= 0 and board[by][bx]:  # overlap with existing pieces
-                    return True
-    return False
+# every possible board row prerendered, rows with the piece are memoized
+ROW_STR_BOARD = [''.join(EMOJI_MAP[(m >> x) & 1] for x in range(WIDTH))
+                 for m in range(1 << WIDTH)]
+_row_str_with_piece = {}
 
 
-def merge_piece(board, piece, px, py):  # adds piece to board
-    for y, row in enumerate(piece):
-        for x, cell in enumerate(row):
-            if cell:
-                bx, by = px + x, py + y
-                if 0 <= bx < WIDTH and 0 <= by < HEIGHT:
-                    board[by][bx] = 1
+def render_row(row, piece_row=0):
+    if not piece_row:
+        return ROW_STR_BOARD[row]
+    line = _row_str_with_piece.get((row, piece_row))
+    if line is None:
+        line = ''.join(EMOJI_MAP[2 if (piece_row >> x) & 1 else (row >> x) & 1]
+                       for x in range(WIDTH))  # change to emojis
+        _row_str_with_piece[row, piece_row] = line
+    return line
+
+
+def _make_collider(rows):
+    """Generate a straight-line collision test for one rotation, no loops left"""
+    width, height = PIECE_EXTENTS[rows]
+    # walls and floor in one bounding box test, rotations are packed left-aligned
+    tests = ["px < 0", f"px > {WIDTH - width}", f"py > {HEIGHT - height}"]
+    for y, row in enumerate(rows):
+        if row:  # overlap with existing pieces, rows above the board are skipped
+            tests.append(f"(py >= {-y} and board[py + {y}] & {row} << px != 0)")
+    src = f"def collide(board, px, py):\n    return {' or '.join(tests)}\n"
+    namespace = {}
+    exec(src, namespace)
+    return namespace["collide"]
+
 
+# collide(board, px, py) for every rotation state, keyed like BOTTOM_PROFILES
+COLLIDERS = {rows: _make_collider(rows) for rows in PIECE_EXTENTS}
 
-def clear_lines(board):
-    new_board = [row for row in board if not all(row)]  # removes full lines
-    lines_cleared = HEIGHT - len(new_board)
-    for _ in range(lines_cleared):
-        new_board.insert(0, [0] * WIDTH)  # adds removed lines
-    return new_board, lines_cleared
+
+def check_collision(board, piece, px, py):
+    return COLLIDERS[piece](board, px, py)
+
+
+def merge_piece(board, piece, px, py, columns=None):  # adds piece to board
+    for y, row in enumerate(piece):
+        by = py + y
+        if 0 <= by < HEIGHT:
+            shifted = shift_row(row, px) & ROW_MASK
+            board[by] |= shifted
+            if columns is not None:  # same cells in the column view, bit y is row y
+                for x in range(WIDTH):
+                    if (shifted >> x) & 1:
+                        columns[x] |= 1 << by
+
+
+def clear_lines(board, columns=None, rows=None):
+    """Remove full lines, only the given rows are checked when rows is set"""
+    full = [y for y in (range(HEIGHT) if rows is None else rows)
+            if 0 <= y < HEIGHT and board[y] == ROW_MASK]
+    if not full:
+        return board, 0
+    if columns is not None:
+        # top to bottom, rows above a cleared one move down a bit
+        for y in full:
+            above, below = (1 << y) - 1, ~((2 << y) - 1)
+            for x in range(WIDTH):
+                columns[x] = (columns[x] & below) | ((columns[x] & above) << 1)
+    new_board = [row for row in board if row != ROW_MASK]  # removes full lines
+    return [0] * len(full) + new_board, len(full)  # adds removed lines
 
 
 class TetrisGame:
-    def __init__(self):
+    def __init__(self, author=None):
         self.board = empty_board()
         self.score = 0
         self.game_over = False
         self.lines_cleared_total = 0
         self.start_time = time.time()
         self.current_piece_type = None
+        self.rot = 0
+        self.version = 0  # bumped on every visible state change
+        # player details captured once, score logging never looks the user up
+        self.author_id = author.id if author else None
+        self.author_name = getattr(author, "display_name", str(author))
+        self.author_avatar_url = str(author.avatar.url) if author and author.avatar else ""
         self._logged = False
+        # rendered rows, only rows under the old or new piece get rebuilt
+        self._row_cache = [EMOJI_MAP[0] * WIDTH] * HEIGHT
+        self._prev_footprint = range(0)
+        self._board_dirty = True
+        self._render_version = -1
+        self._render_cache = None
+        self.columns = [0] * WIDTH  # board as column bitmasks, for hard drops
         self.spawn_piece()
 
+    @property
+    def piece(self):
+        """Row masks of the falling piece, shared from ROTATIONS"""
+        return ROTATIONS[self.current_piece_type][self.rot]
+
+    def _next_piece(self):
+        """Pick a random piece, returns (type, rotation, spawn column)"""
+        piece_type = PIECE_IDS[random.randrange(len(PIECE_IDS))]
+        rot = random.getrandbits(2) % len(ROTATIONS[piece_type])
+        return piece_type, rot, WIDTH // 2 - piece_width(ROTATIONS[piece_type][rot]) // 2
+
     def spawn_piece(self):
-        piece_type = random.choice(list(PIECES.keys()))
-        self.current_piece_type = piece_type
-        self.piece = [row[:] for row in PIECES[piece_type]]
-        # random rotation
-        for _ in range(random.randint(0, 3)):
-            if piece_type == 'I':
-                self.piece = rotate_i_piece_center(self.piece)
-            else:
-                self.piece = rotate_piece(self.piece)
-        self.px = WIDTH // 2 - len(self.piece[0]) // 2
+        self.current_piece_type, self.rot, self.px = self._next_piece()
         self.py = 0
 
     def move_left(self):
-        if not self.game_over and not check_collision(self.board, self.piece, self.px - 1, self.py):
+        if not self.game_over and not COLLIDERS[self.piece](self.board, self.px - 1, self.py):
             self.px -= 1
+            self.version += 1
+            return True
+        return False
 
     def move_right(self):
-        if not self.game_over and not check_collision(self.board, self.piece, self.px + 1, self.py):
+        if not self.game_over and not COLLIDERS[self.piece](self.board, self.px + 1, self.py):
             self.px += 1
+            self.version += 1
+            return True
+        return False
 
     def rotate(self):
         if self.game_over:
-            return
+            return False
 
+        new_rot = (self.rot + 1) % len(ROTATIONS[self.current_piece_type])
+        rotated_piece = ROTATIONS[self.current_piece_type][new_rot]
         if self.current_piece_type == 'I':
-            rotated_piece = rotate_i_piece_center(self.piece)
             # calculate offset to keep piece centered
             if len(self.piece) == 1 and len(rotated_piece) == 3:  # horizontal to vertical
                 new_px, new_py = self.px + 1, self.py - 1
@@ -190,30 +444,33 @@ class TetrisGame:
             for kick_x, kick_y in wall_kicks:
                 test_px, test_py = new_px + kick_x, new_py + kick_y
                 if not check_collision(self.board, rotated_piece, test_px, test_py):
-                    self.piece, self.px, self.py = rotated_piece, test_px, test_py
-                    return
-            # if no valid position found, just don't rotate
+                    self.rot, self.px, self.py = new_rot, test_px, test_py
+                    self.version += 1
+                    return True
+            return False  # no valid position found, just don't rotate
         else:
-            rotated_piece = rotate_piece(self.piece)
             # try basic rotation first
             if not check_collision(self.board, rotated_piece, self.px, self.py):
-                self.piece = rotated_piece
-                return
+                self.rot = new_rot
+                self.version += 1
+                return True
 
             # try wall kicks for L piece
             wall_kicks = [(0, 0), (-1, 0), (1, 0), (0, -1), (-1, -1), (1, -1)]
             for kick_x, kick_y in wall_kicks:
                 test_px, test_py = self.px + kick_x, self.py + kick_y
                 if not check_collision(self.board, rotated_piece, test_px, test_py):
-                    self.piece, self.px, self.py = rotated_piece, test_px, test_py
-                    return
-            # if no valid position found, just don't rotate
+                    self.rot, self.px, self.py = new_rot, test_px, test_py
+                    self.version += 1
+                    return True
+            return False  # no valid position found, just don't rotate
 
     def drop(self):
         if self.game_over:
             return False
-        if not check_collision(self.board, self.piece, self.px, self.py + 1):
+        if not COLLIDERS[self.piece](self.board, self.px, self.py + 1):  # once per tick
             self.py += 1
+            self.version += 1
             return True
         else:
             self.land_piece()
@@ -221,51 +478,58 @@ class TetrisGame:
 
     def hard_drop(self):
         if self.game_over:
-            return
-        while not check_collision(self.board, self.piece, self.px, self.py + 1):
-            self.py += 1
-            self.score += 2  # points for hard dropping
+            return False
+        dist = drop_distance(self.columns, BOTTOM_PROFILES[self.piece], self.px, self.py)
+        self.py += dist
+        self.score += 2 * dist  # points for hard dropping
         self.land_piece()
+        return True
 
     def land_piece(self):
-        merge_piece(self.board, self.piece, self.px, self.py)
-        self.board, lines_cleared = clear_lines(self.board)
+        merge_piece(self.board, self.piece, self.px, self.py, self.columns)
+        # only rows the piece just filled can have become full
+        self.board, lines_cleared = clear_lines(
+            self.board, self.columns, range(self.py, self.py + len(self.piece)))
         self.lines_cleared_total += lines_cleared
         self.score += (lines_cleared ** 2) * 100
+        self.version += 1
+        self._board_dirty = True
 
-        # Generate the actual next piece that would spawn
-        next_piece_type = random.choice(list(PIECES.keys()))
-        next_piece = [row[:] for row in PIECES[next_piece_type]]
-        # Apply random rotation like in spawn_piece
-        for _ in range(random.randint(0, 3)):
-            if next_piece_type == 'I':
-                next_piece = rotate_i_piece_center(next_piece)
-            else:
-                next_piece = rotate_piece(next_piece)
-
-        next_px = WIDTH // 2 - len(next_piece[0]) // 2
-        next_py = 0
-
-        # Check if this actual next piece can spawn
-        if check_collision(self.board, next_piece, next_px, next_py):
+        # Generate the actual next piece and check that it can spawn
+        next_piece_type, next_rot, next_px = self._next_piece()
+        if check_collision(self.board, ROTATIONS[next_piece_type][next_rot], next_px, 0):
             self.game_over = True
             return
 
         # If no collision, spawn the piece we just generated
-        self.current_piece_type = next_piece_type
-        self.piece = next_piece
-        self.px = next_px
-        self.py = next_py
+        self.current_piece_type, self.rot, self.px, self.py = next_piece_type, next_rot, next_px, 0
 
     def get_game_time(self):
         return time.time() - self.start_time
 
+    def render_rows(self):
+        footprint = range(self.py, self.py + len(self.piece))
+        if self._board_dirty:  # piece locked, every row may have moved
+            dirty = range(HEIGHT)
+            self._board_dirty = False
+        else:
+            dirty = set(self._prev_footprint).union(footprint)
+        for y in dirty:
+            if 0 <= y < HEIGHT:
+                piece_row = shift_row(self.piece[y - self.py], self.px) if y in footprint else 0
+                self._row_cache[y] = render_row(self.board[y], piece_row)
+        self._prev_footprint = footprint
+        return '\n'.join(self._row_cache)
+
     def render(self):
         if self.game_over:
             game_time = self.get_game_time()
             return f"GAME OVER!\nScore: {self.score}\nLines: {self.lines_cleared_total}\nTime: {game_time:.1f}s\n\nUse `!tris` to start a new game"
-        return f"Tris\nScore: {self.score}\nLines: {self.lines_cleared_total}\n\n{render_board(self.board, self.piece, self.px, self.py)}"
-        # previous line looks like hell but it works so i wont change it
+        if self._render_version != self.version:
+            self._render_cache = f"Tris\nScore: {self.score}\nLines: {self.lines_cleared_total}\n\n{self.render_rows()}"
+            # previous line looks like hell but it works so i wont change it
+            self._render_version = self.version
+        return self._render_cache
 
 
 # bot setup
@@ -282,88 +546,131 @@ async def help_command(ctx):
     """Show the Tris Bot help menu (same as !trishelp)"""
     await trishelp_command(ctx)
 
-games = {}
-messages = {}
-tasks = {}
+@dataclass(slots=True)
+class UserSession:
+    """Everything tracked for one player's game"""
+    game: TetrisGame
+    message: discord.Message | None = None
+    last_render_version: int = -1  # game version of the last queued edit
+    next_drop: float = 0.0  # time.monotonic() of the next auto-drop
+
+    def message_gone(self, message):
+        """A queued edit found the game message deleted, post a fresh one"""
+        if self.message is not message:
+            return
+        self.message = None
+        user_id = self.game.author_id
+        if not self.game.game_over and sessions.get(user_id) is self:
+            spawn(update_display(message.channel, user_id))
+
+
+sessions = {}
+running = {}  # user_id -> session of a game still in play, the only ones the ticker walks
+outbox = DiscordOutbox()
+_ticker_handle = None  # asyncio.TimerHandle of the next tick
+_background_tasks = set()  # the loop only keeps weak references to tasks
 
 REACTION_CONTROLS = {'⬅️': 'a', '➡️': 'd', '⬇️': 's', '🔄': 'w', '❌': 'q'}
 
+# chat commands, compound ones must fully match a run of game keys
+GAME_KEYS = "adswq"
+_COMPOUND_CMD_RE = re.compile(f"[{GAME_KEYS}]+")
+MAX_COMPOUND = 32
+_SINGLE_CMDS = frozenset({'tris', 'a', 'd', 's', 'w', 'q', 'trishelp', 'score', 'setspeed'})
+
 # Global drop speed (in seconds)
 DROP_SPEED = 0.7
+# Moves inside this window share one message edit, also the longest gap between ticks
+EDIT_DEBOUNCE = 0.2
 
 
-def log_game_score(game, user_id, user):
-    """Helper function to log game score"""
-    if game.score > 0 and not game._logged:
-        username = getattr(user, "display_name", str(user))
-        avatar_url = str(user.avatar.url) if user.avatar else ""
-        save_score(username, game.score, avatar_url, user_id,
-                   game.lines_cleared_total, game.get_game_time())
-        game._logged = True
+def finalize_game(game):
+    """Log the game score once, for the player stored on the game"""
+    session = running.get(game.author_id)
+    if session is not None and session.game is game:
+        del running[game.author_id]  # finished, the ticker can forget it
+    if game._logged or game.score <= 0 or game.author_id is None:
+        return
+    save_score(game.author_name, game.score, game.author_avatar_url, game.author_id,
+               game.lines_cleared_total, game.get_game_time())
+    game._logged = True
 
 
 async def cleanup_user_game(user_id):
     """Clean up all resources for a specific user's game"""
-    game = games.get(user_id)
-    if game and game.game_over:
-        user = bot.get_user(user_id) or next((guild.get_member(user_id)
-                                              for guild in bot.guilds if guild.get_member(user_id)), None)
-        if user:
-            log_game_score(game, user_id, user)
-
-    # Cancel task and clean up
-    if user_id in tasks:
-        tasks[user_id].cancel()
-        tasks.pop(user_id, None)
-
-    # Clean up message
-    if user_id in messages:
+    session = sessions.pop(user_id, None)
+    running.pop(user_id, None)
+    if not session:
+        return
+
+    if session.game.game_over:
+        finalize_game(session.game)
+
+    # Clean up message, deleting it takes the reactions with it
+    if session.message:
         try:
-            await messages[user_id].clear_reactions()
-            await messages[user_id].delete()
+            await outbox.delete(session.message)
         except (discord.NotFound, discord.Forbidden):
             pass
-        messages.pop(user_id, None)
 
-    games.pop(user_id, None)
 
+async def show_game_over(session):
+    """Show the final screen as soon as a game ends"""
+    finalize_game(session.game)
+    msg = session.message
+    if msg:
+        outbox.edit(msg, session.game.render)
+        session.last_render_version = session.game.version
+        try:
+            await msg.clear_reactions()  # clear reactions immediately
+        except (discord.NotFound, discord.HTTPException):
+            pass
 
-async def auto_drop(user_id):
-    """Auto-drop task - smoother with reduced interval"""
-    try:
-        while user_id in games:
-            game = games.get(user_id)
-            if not game or game.game_over:
-                break
-
-            prev_score = game.score
-            prev_game_over = game.game_over
-
-            moved = game.drop()
-
-            # Check if game state changed (score, game over, or piece moved)
-            if moved or game.score != prev_score or game.game_over != prev_game_over:
-                msg = messages.get(user_id)
-                if msg:
-                    try:
-                        await msg.edit(content=game.render())
-                        # If game just ended, clear reactions immediately
-                        if game.game_over and not prev_game_over:
-                            await msg.clear_reactions()
-                    except (discord.NotFound, discord.HTTPException):
-                        break
 
-            # Exit if game is over
+def spawn(coro):
+    """Run a coroutine in the background, holding on to its task until it finishes"""
+    task = bot.loop.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+def auto_drop():
+    """Single ticker on a re-armed timer, drops games on their own clock and edits dirty boards"""
+    global _ticker_handle
+    try:
+        now = time.monotonic()
+        for session in list(running.values()):
+            game = session.game
             if game.game_over:
-                break
+                continue
 
-            await asyncio.sleep(DROP_SPEED)  # Use configurable drop speed
-    except asyncio.CancelledError:
-        pass
+            if now >= session.next_drop:
+                # stay on the DROP_SPEED schedule, re-base only after falling behind
+                session.next_drop += DROP_SPEED
+                if session.next_drop <= now:
+                    session.next_drop = now + DROP_SPEED
+                game.drop()
+                if game.game_over:
+                    spawn(show_game_over(session))
+                    continue
+
+            # Only edit when something changed since the last edit
+            if game.version != session.last_render_version and session.message:
+                outbox.edit(session.message, game.render, session.message_gone)
+                session.last_render_version = game.version
     finally:
-        # Clean up when task ends
-        if user_id in tasks:
-            tasks.pop(user_id, None)
+        # keep ticking while any game is running, !tris re-arms it otherwise
+        _ticker_handle = start_ticker() if running else None
+
+
+def start_ticker():
+    """Arm the next tick, early enough for the next drop that is due"""
+    delay = EDIT_DEBOUNCE
+    drops = [s.next_drop for s in running.values() if not s.game.game_over]
+    if drops:
+        delay = min(delay, max(0.0, min(drops) - time.monotonic()))
+    return bot.loop.call_later(delay, auto_drop)
 
 
 async def add_game_reactions(message):
@@ -376,49 +683,40 @@ async def add_game_reactions(message):
 
 
 async def update_display(ctx_or_msg, user_id):
-    game = games.get(user_id)
-    if not game:
+    session = sessions.get(user_id)
+    if not session:
         return
 
-    msg = messages.get(user_id)
+    game = session.game
     channel = ctx_or_msg.channel if hasattr(
         ctx_or_msg, 'channel') else ctx_or_msg
 
     try:
-        if msg:
-            await msg.edit(content=game.render())
+        if session.message:
+            outbox.edit(session.message, game.render, session.message_gone)
         else:
-            new_msg = await channel.send(game.render())
-            messages[user_id] = new_msg
-            await add_game_reactions(new_msg)
+            session.message = await outbox.send(channel, game.render())
+            await add_game_reactions(session.message)
     except (discord.NotFound, discord.HTTPException):
-        new_msg = await channel.send(game.render())
-        messages[user_id] = new_msg
-        await add_game_reactions(new_msg)
+        session.message = await channel.send(game.render())
+        await add_game_reactions(session.message)
+    session.last_render_version = game.version
 
     # Handle game over - immediate cleanup
     if game.game_over:
-        msg = messages.get(user_id)
-        if msg:
+        if session.message:
             try:
-                await msg.clear_reactions()
+                await session.message.clear_reactions()
             except (discord.NotFound, discord.Forbidden):
                 pass
 
         # Log score
-        user = getattr(ctx_or_msg, 'author', None) or bot.get_user(user_id) or next(
-            (guild.get_member(user_id) for guild in bot.guilds if guild.get_member(user_id)), None)
-        if user:
-            log_game_score(game, user_id, user)
-
-        # Cancel auto-drop task to prevent further updates
-        if user_id in tasks:
-            tasks[user_id].cancel()
-            tasks.pop(user_id, None)
+        finalize_game(game)
 
 
 @bot.event
 async def on_ready():
+    _load_cache()  # read tris.log once up front, not on the first game over
     print(f"{bot.user}")
     print("------")
 
@@ -426,16 +724,21 @@ async def on_ready():
 @bot.command()
 async def tris(ctx):
     """Start the game >w<"""
+    global _ticker_handle
     user_id = ctx.author.id
 
     # Log previous game if completed
-    if user_id in games and games[user_id].game_over:
-        log_game_score(games[user_id], user_id, ctx.author)
+    session = sessions.get(user_id)
+    if session and session.game.game_over:
+        finalize_game(session.game)
 
     await cleanup_user_game(user_id)
-    games[user_id] = TetrisGame()
+    game = TetrisGame(ctx.author)
+    session = sessions[user_id] = running[user_id] = UserSession(
+        game, next_drop=time.monotonic() + DROP_SPEED)
     await update_display(ctx, user_id)
-    tasks[user_id] = bot.loop.create_task(auto_drop(user_id))
+    if _ticker_handle is None:
+        _ticker_handle = start_ticker()
 
 
 @bot.command(name="trishelp")
@@ -482,10 +785,8 @@ Admin:
 @bot.command()
 async def score(ctx, *, user: discord.Member = None):
     """Display top 10 high scores, or stats for a mentioned user."""
-    scores = load_scores()
     if user:
-        # Try to match by user_id
-        entry = next((s for s in scores if s.get("user_id") == user.id), None)
+        entry = _load_cache().get(user.id)
         if not entry:
             await ctx.send(f"No stats found for {user.display_name}.")
             return
@@ -496,24 +797,7 @@ async def score(ctx, *, user: discord.Member = None):
         avatar_url = entry.get("avatar_url", "")
         if avatar_url:
             embed.set_thumbnail(url=avatar_url)
-        date = datetime.fromisoformat(entry["timestamp"]).strftime("%m/%d")
-        games_played = entry.get("games_played", 1)
-        total_lines = entry.get("total_lines", 0)
-        total_time = entry.get("total_time", 0)
-        best_lines = entry.get("best_lines", 0)
-        best_time = entry.get("best_time", 0)
-        best_lines_date = f" ({datetime.fromisoformat(entry['best_lines_timestamp']).strftime('%m/%d')})" if "best_lines_timestamp" in entry else ""
-        best_time_date = f" ({datetime.fromisoformat(entry['best_time_timestamp']).strftime('%m/%d')})" if "best_time_timestamp" in entry else ""
-        avg_score = entry["score"] / games_played if games_played > 0 else 0
-        avg_lines = total_lines / games_played if games_played > 0 else 0
-        avg_time = total_time / games_played if games_played > 0 else 0
-        stats_text = (
-            f"**Best Score:** {entry['score']:,} pts ({date})\n"
-            f"**Games:** {games_played} | **Avg Score:** {avg_score:,.0f}\n"
-            f"**Best Lines:** {best_lines}{best_lines_date} | **Total:** {total_lines:,} | **Avg:** {avg_lines:.1f}\n"
-            f"**Longest game:** {best_time:.1f}s{best_time_date} | **Avg Time:** {avg_time:.1f}s\n"
-            f"**Total Time:** {total_time:.1f}s"
-        )
+        stats_text = score_stats_text(entry)
         embed.add_field(name="Statistics", value=stats_text, inline=False)
         embed.set_footer(text=">w<")
         await ctx.send(embed=embed)
@@ -526,27 +810,8 @@ async def score(ctx, *, user: discord.Member = None):
         for i, score_entry in enumerate(top_scores):
             rank = i + 1
             username = score_entry["username"]
-            score_val = score_entry["score"]
-            date = datetime.fromisoformat(
-                score_entry["timestamp"]).strftime("%m/%d")
             avatar_url = score_entry.get("avatar_url", "")
-            games_played = score_entry.get("games_played", 1)
-            total_lines = score_entry.get("total_lines", 0)
-            total_time = score_entry.get("total_time", 0)
-            best_lines = score_entry.get("best_lines", 0)
-            best_time = score_entry.get("best_time", 0)
-            best_lines_date = f" ({datetime.fromisoformat(score_entry['best_lines_timestamp']).strftime('%m/%d')})" if "best_lines_timestamp" in score_entry else ""
-            best_time_date = f" ({datetime.fromisoformat(score_entry['best_time_timestamp']).strftime('%m/%d')})" if "best_time_timestamp" in score_entry else ""
-            avg_score = score_val / games_played if games_played > 0 else 0
-            avg_lines = total_lines / games_played if games_played > 0 else 0
-            avg_time = total_time / games_played if games_played > 0 else 0
-            stats_text = (
-                f"**Best Score:** {score_val:,} pts ({date})\n"
-                f"**Games:** {games_played} | **Avg Score:** {avg_score:,.0f}\n"
-                f"**Best Lines:** {best_lines}{best_lines_date} | **Total:** {total_lines:,} | **Avg:** {avg_lines:.1f}\n"
-                f"**Longest game:** {best_time:.1f}s{best_time_date} | **Avg Time:** {avg_time:.1f}s\n"
-                f"**Total Time:** {total_time:.1f}s"
-            )
+            stats_text = score_stats_text(score_entry)
             medal = "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else f"{rank}."
             embed = discord.Embed(
                 title=f"{medal} {username}",
@@ -589,29 +854,38 @@ async def on_message(message):
 
     if message.content.startswith("!"):
         commands_str = message.content[1:].lower()
-        valid_commands = {'a', 'd', 's', 'w', 'q'}
 
-        # Handle compound commands
-        if all(c in valid_commands for c in commands_str):
+        # Handle compound commands, the length cap rejects long messages before the regex
+        if len(commands_str) <= MAX_COMPOUND and _COMPOUND_CMD_RE.fullmatch(commands_str):
             user_id = message.author.id
-            game = games.get(user_id)
+            session = sessions.get(user_id)
+            game = session.game if session else None
             if game and not game.game_over:
-                prev_score = game.score
+                blocked = set()  # moves that just failed, they keep failing until something moves
                 for cmd in commands_str:
+                    if cmd in blocked:
+                        continue
                     if cmd == 'a':
-                        game.move_left()
+                        moved = game.move_left()
                     elif cmd == 'd':
-                        game.move_right()
+                        moved = game.move_right()
                     elif cmd == 's':
-                        game.hard_drop()
+                        moved = game.hard_drop()
                     elif cmd == 'w':
-                        game.rotate()
+                        moved = game.rotate()
                     elif cmd == 'q':
                         game.game_over = True
-                        log_game_score(game, user_id, message.author)
+                        finalize_game(game)
                         break
-
-                if game.score != prev_score or game.game_over:
+                    if game.game_over:
+                        break  # topped out, skip the rest of the sequence
+                    if moved:
+                        blocked.clear()
+                    else:
+                        blocked.add(cmd)
+
+                # moves are picked up by the ticker, game over shows right away
+                if game.game_over:
                     await update_display(message, user_id)
                 try:
                     await message.delete()
@@ -620,7 +894,7 @@ async def on_message(message):
                 return
 
         # Clean up command messages
-        if commands_str in ['tris', 'a', 'd', 's', 'w', 'q', 'trishelp', 'score', 'setspeed']:
+        if commands_str in _SINGLE_CMDS:
             try:
                 await message.delete()
             except discord.Forbidden:
@@ -637,19 +911,18 @@ async def on_message(message):
 @bot.event
 async def on_reaction_add(reaction, user):
     """Handle reaction-based game controls"""
-    if user.bot or user.id not in messages or messages[user.id].id != reaction.message.id:
+    session = sessions.get(user.id)
+    if user.bot or not session or not session.message or session.message.id != reaction.message.id:
         return
 
-    game = games.get(user.id)
-    if not game or game.game_over:
+    game = session.game
+    if game.game_over:
         return
 
     command = REACTION_CONTROLS.get(str(reaction.emoji))
     if not command:
         return
 
-    prev_score = game.score
-
     if command == 'a':
         game.move_left()
     elif command == 'd':
@@ -660,9 +933,9 @@ async def on_reaction_add(reaction, user):
         game.rotate()
     elif command == 'q':
         game.game_over = True
-        log_game_score(game, user.id, user)
+        finalize_game(game)
 
-    if game.score != prev_score or game.game_over:
+    if game.game_over:
         await update_display(reaction.message, user.id)
 
     try:
@@ -677,15 +950,26 @@ async def on_member_remove(member):
     await cleanup_user_game(member.id)
 
 
+# recognized commands for this bot, matched on the first word
+# !highscores is the old name of !score, kept so old messages still get cleaned up
+DELALL_COMMANDS = frozenset({
+    "!tris", "!a", "!d", "!s", "!w", "!q", "!trishelp", "!help", "!score", "!highscores",
+    "!delall", "!setspeed"
+})
+
+
+def is_bot_command(content):
+    """Check if a message is a command to this bot, compound moves included"""
+    if not content.startswith("!"):
+        return False
+    word = content.split(maxsplit=1)[0].lower()
+    return word in DELALL_COMMANDS or _COMPOUND_CMD_RE.fullmatch(word, 1) is not None
+
+
 @bot.command()
 async def delall(ctx):
     """Delete all messages sent by this bot and all command messages to this bot in the current channel"""
-    deleted_count = 0
     status_msg = await ctx.send("Deleting all bot and command messages from this channel...")
-    # list of recognized command prefixes for this bot
-    command_prefixes = [
-        "!tris", "!a", "!d", "!s", "!w", "!q", "!trishelp", "!highscores", "!delall", "!setspeed"
-    ]
     try:
         # only current channel
         channel = ctx.channel
@@ -693,40 +977,21 @@ async def delall(ctx):
             await status_msg.edit(content="No permission to read message history in this channel.")
             return
 
-        async for message in channel.history(limit=1000):
+        def is_ours(message):
             # skip the current delall command message and status message
             if message.id == ctx.message.id or message.id == status_msg.id:
-                continue
+                return False
+            # messages from the bot and commands to the bot
+            return message.author == bot.user or is_bot_command(message.content)
 
-            # delete if message is from the bot
-            if message.author == bot.user:
-                try:
-                    await message.delete()
-                    deleted_count += 1
-                    if deleted_count % 20 == 0:
-                        try:
-                            await status_msg.edit(content=f"Deleted {deleted_count} messages...")
-                        except (discord.NotFound, discord.HTTPException):
-                            pass
-                    await asyncio.sleep(0.1)
-                except (discord.NotFound, discord.Forbidden):
-                    pass
-            # delete if message is a command to the bot
-            elif (
-                message.content.startswith("!")
-                and any(message.content.lower().startswith(cmd) for cmd in command_prefixes)
-            ):
-                try:
-                    await message.delete()
-                    deleted_count += 1
-                    if deleted_count % 20 == 0:
-                        try:
-                            await status_msg.edit(content=f"Deleted {deleted_count} messages...")
-                        except (discord.NotFound, discord.HTTPException):
-                            pass
-                    await asyncio.sleep(0.1)
-                except (discord.NotFound, discord.Forbidden):
-                    pass
+        # purge bulk deletes recent messages 100 at a time, older ones one by one
+        try:
+            deleted = await channel.purge(limit=1000, check=is_ours, bulk=True)
+        except discord.Forbidden:
+            # no manage messages permission, the bot can still remove its own
+            deleted = await channel.purge(
+                limit=1000, check=lambda m: m.author == bot.user and is_ours(m), bulk=False)
+        deleted_count = len(deleted)
 
         try:
             await status_msg.edit(content=f"Deleted {deleted_count} bot and command messages from this channel.")